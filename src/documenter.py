@@ -2,7 +2,9 @@ import os
 import argparse
 from utils import get_directory_structure, create_markdown_from_structure, parse_gitignore, build_tree_string
 
-def create_markdown_for_directory(rootdir, output_file, additional_ignores=None):
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+def create_markdown_for_directory(rootdir, output_file, additional_ignores=None, deduplicate=True, max_file_size=None, default_ignores=True):
     """
     Creates a markdown file with the directory structure and content of all files.
     """
@@ -11,22 +13,35 @@ def create_markdown_for_directory(rootdir, output_file, additional_ignores=None)
     ignore_patterns = parse_gitignore(gitignore_path) if os.path.exists(gitignore_path) else []
 
     # Get the directory structure, ignoring the patterns from .gitignore
-    structure = get_directory_structure(rootdir, ignore_patterns)
+    structure = get_directory_structure(rootdir, ignore_patterns, default_ignores=default_ignores)
 
-    with open(output_file, 'w') as markdown_file:
+    # A large write buffer keeps the number of write syscalls low for big outputs
+    with open(output_file, 'w', encoding='utf-8', buffering=OUTPUT_BUFFER_SIZE) as markdown_file:
         # Write the project tree at the beginning of the file
         tree_string = build_tree_string(structure)
         markdown_file.write("# Project Tree\n\n")
         markdown_file.write(f"```\n{tree_string}\n```\n\n")
         
         # Write the detailed contents
-        create_markdown_from_structure(structure, rootdir, markdown_file, additional_ignores=additional_ignores)
+        create_markdown_from_structure(structure, rootdir, markdown_file, additional_ignores=additional_ignores, deduplicate=deduplicate, max_file_size=max_file_size)
+
+def non_negative_int(value):
+    """
+    Parses a command-line argument as an integer that is zero or greater.
+    """
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative: {value}")
+    return number
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate a Markdown file documenting the structure and content of a directory.')
     parser.add_argument('directory', type=str, help='The root directory of the project to document.')
     parser.add_argument('output', type=str, help='The output Markdown file.')
     parser.add_argument('--ignore', type=str, nargs='*', default=[], help='Additional files or folders to ignore from the documentation.')
+    parser.add_argument('--max-file-size', type=non_negative_int, default=None, help='Replace the content of files larger than this many bytes with a note.')
+    parser.add_argument('--no-default-ignores', action='store_true', help='Also document dependency and cache folders such as node_modules and virtual environments.')
+    parser.add_argument('--no-dedupe', action='store_true', help='Write the content of identical files every time instead of referring to the first copy.')
     
     args = parser.parse_args()
     
@@ -35,7 +50,7 @@ if __name__ == "__main__":
     additional_ignores = args.ignore
     
     if os.path.isdir(root_directory):
-        create_markdown_for_directory(root_directory, output_markdown_file, additional_ignores)
+        create_markdown_for_directory(root_directory, output_markdown_file, additional_ignores, deduplicate=not args.no_dedupe, max_file_size=args.max_file_size, default_ignores=not args.no_default_ignores)
         print(f"Markdown file created: {output_markdown_file}")
     else:
         print(f"Error: The directory '{root_directory}' does not exist.")
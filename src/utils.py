@@ -1,5 +1,76 @@
 import os
+import re
+import mmap
 import fnmatch
+import hashlib
+import functools
+import itertools
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Dependency and cache directories that are not documented unless default ignores are turned off
+DEFAULT_IGNORED_DIRS = frozenset({
+    'node_modules', 'bower_components', 'jspm_packages',
+    '__pycache__', '__pypackages__',
+})
+
+# File that marks a directory as a Python virtual environment, whatever its name
+VENV_MARKER = 'pyvenv.cfg'
+
+# Returned instead of the content of a binary or oversized file, with the reason noted in its section
+SkippedFile = namedtuple('SkippedFile', 'reason')
+BINARY_FILE = SkippedFile('binary file')
+
+# Characters that make fnmatch treat a pattern as a wildcard
+_GLOB_MAGIC = re.compile('[*?[]')
+
+# Threads listing directories concurrently during the scan
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Files at least this large are decoded from a memory map
+MMAP_THRESHOLD = 1 << 20
+
+# Number of leading and trailing bytes checked for NUL bytes when detecting binaries
+SNIFF_HEAD_SIZE = 1024
+SNIFF_TAIL_SIZE = 512
+
+# Extensions of binary formats whose content is never read
+BINARY_EXTENSIONS = frozenset({
+    'png', 'jpg', 'jpeg', 'gif', 'bmp', 'ico', 'webp', 'tif', 'tiff', 'psd',
+    'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'odt',
+    'zip', 'gz', 'tgz', 'bz2', 'xz', 'zst', '7z', 'rar', 'tar', 'jar', 'war', 'whl', 'egg',
+    'exe', 'dll', 'so', 'dylib', 'a', 'lib', 'o', 'bin', 'class', 'pyc', 'pyo', 'pyd', 'wasm',
+    'mp3', 'mp4', 'wav', 'flac', 'ogg', 'avi', 'mov', 'mkv', 'webm',
+    'ttf', 'otf', 'woff', 'woff2', 'eot',
+    'sqlite', 'sqlite3', 'db', 'pkl', 'pickle', 'npy', 'npz', 'h5', 'parquet',
+})
+
+# Byte order marks of encodings that would otherwise fail UTF-8 and end up as latin-1.
+# UTF-32 comes first since its little-endian mark starts with the UTF-16 one.
+TEXT_BOMS = (
+    (b'\xff\xfe\x00\x00', 'utf-32'),
+    (b'\x00\x00\xfe\xff', 'utf-32'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16'),
+)
+
+# Leading bytes of common binary formats, checked before decoding the whole file
+BINARY_SIGNATURES = (
+    b'\x89PNG\r\n\x1a\n',     # PNG
+    b'\xff\xd8\xff',          # JPEG
+    b'GIF87a', b'GIF89a',     # GIF
+    b'%PDF-',                 # PDF
+    b'PK\x03\x04',            # ZIP, JAR, Office documents
+    b'\x1f\x8b',              # gzip
+    b'(\xb5/\xfd',            # zstd
+    b'7z\xbc\xaf\x27\x1c',    # 7-Zip
+    b'Rar!\x1a\x07',          # RAR
+    b'\x7fELF',               # ELF executables and shared objects
+    b'\xca\xfe\xba\xbe',      # Java class, Mach-O universal
+    b'\xcf\xfa\xed\xfe',      # Mach-O 64-bit
+    b'\x00asm',               # WebAssembly
+    b'SQLite format 3\x00',   # SQLite
+)
 
 def parse_gitignore(gitignore_path):
     """
@@ -9,114 +80,435 @@ def parse_gitignore(gitignore_path):
         patterns = [line.strip() for line in file if line.strip() and not line.startswith('#')]
     return patterns
 
-def matches_pattern(path, patterns):
+def matches_pattern(path, patterns, is_dir=True):
+    """
+    Checks if the given path, relative to the root, matches any of the ignore patterns.
+    Directory patterns (trailing '/') only match when is_dir is true.
+    """
+    path = os.path.normcase(path)
+    name = path.rpartition(os.sep)[2]
+    return matches_compiled(name, path, is_dir, compile_patterns(tuple(patterns)))
+
+def matches_compiled(name, path, is_dir, compiled):
+    """
+    Checks an entry name and its root-relative path, both already passed through
+    os.path.normcase, against the matchers returned by compile_patterns.
+    """
+    name_matcher, path_matcher, dir_name_matcher, dir_path_matcher = compiled
+    if _glob_matches(name, name_matcher) or _glob_matches(path, path_matcher):
+        return True
+    return is_dir and (_glob_matches(name, dir_name_matcher) or _glob_matches(path, dir_path_matcher))
+
+def _glob_matches(value, matcher):
     """
-    Checks if the given path matches any of the ignore patterns.
+    Checks a name or path against a (literals, regex) matcher from _compile_globs.
     """
+    literals, regex = matcher
+    return value in literals or (regex is not None and regex.match(value) is not None)
+
+# Only the .gitignore and --ignore pattern tuples are live in practice, so a small cache is enough
+@functools.lru_cache(maxsize=32)
+def compile_patterns(patterns):
+    """
+    Compiles a tuple of ignore patterns following .gitignore rules. A pattern without a
+    slash matches the entry name at any depth, a pattern with a leading or inner slash
+    matches the path from the root, and a trailing slash restricts it to directories.
+    Returns (name, path, directory name, directory path) matchers.
+    """
+    globs = ([], [], [], [])
     for pattern in patterns:
-        if pattern.endswith('/'):
-            # Pattern is intended to match directories
-            if fnmatch.fnmatch(path + '/', pattern):
-                return True
-            if fnmatch.fnmatch(path + '/', os.path.join('**', pattern)):
-                return True
-        elif pattern.endswith('/*'):
-            # Pattern is intended to match all files in a directory
-            base_pattern = pattern[:-1]  # Remove the trailing '*'
-            if fnmatch.fnmatch(path, base_pattern) or fnmatch.fnmatch(path, os.path.join('**', base_pattern)):
-                return True
+        dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        if pattern.startswith('**/') and '/' not in pattern[3:]:
+            # A leading '**/' matches in every directory, the same as no slash at all
+            pattern = pattern[3:]
+        if pattern.startswith('/'):
+            anchored = True
+            pattern = pattern.lstrip('/')
         else:
-            if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(path, os.path.join('**', pattern)):
-                return True
-    return False
+            anchored = '/' in pattern
+        if pattern:
+            globs[2 * dir_only + anchored].append(os.path.normcase(pattern))
+    return tuple(_compile_globs(group) for group in globs)
 
-def get_directory_structure(rootdir, ignore_patterns=None):
+def _compile_globs(globs):
+    """
+    Compiles globs into a (literals, regex) matcher. Globs without wildcards become a
+    set lookup, and only the remaining globs are translated with fnmatch into one
+    alternation regex (None if there are none).
+    """
+    literals = frozenset(glob for glob in globs if not _GLOB_MAGIC.search(glob))
+    wildcard_globs = [glob for glob in globs if _GLOB_MAGIC.search(glob)]
+
+    regex = None
+    if wildcard_globs:
+        regex = re.compile("|".join(f"(?:{fnmatch.translate(glob)})" for glob in wildcard_globs))
+    return literals, regex
+
+def get_directory_structure(rootdir, ignore_patterns=None, default_ignores=True):
     """
     Creates a nested dictionary that represents the folder structure of rootdir.
+    Directories are listed one level at a time, with the directories of a level
+    split across a thread pool.
+    With default_ignores, dependency and cache directories and virtual environments are left out.
     """
     if ignore_patterns is None:
         ignore_patterns = []
-    
+
     dir_structure = {}
-    for dirpath, dirnames, filenames in os.walk(rootdir):
-        # Get the relative path
-        relative_dir = os.path.relpath(dirpath, rootdir)
-        
-        # Filter out hidden directories and ignored directories
-        dirnames[:] = [d for d in dirnames if not d.startswith('.') and not matches_pattern(os.path.join(relative_dir, d), ignore_patterns)]
-        # Filter out hidden files and ignored files
-        filenames = [f for f in filenames if not f.startswith('.') and not matches_pattern(os.path.join(relative_dir, f), ignore_patterns)]
-        
-        # Build the directory structure
-        subdir = dir_structure
-        if relative_dir != ".":
-            for part in relative_dir.split(os.sep):
-                subdir = subdir.setdefault(part, {})
-        subdir.update({file: None for file in filenames})
+    # Compile the patterns once for the whole walk
+    compiled = compile_patterns(tuple(ignore_patterns))
+    list_directories = functools.partial(_list_directories, compiled=compiled, default_ignores=default_ignores)
+    # Each level holds (dir_path, relative_prefix, parent, name, subdir) for the directories to list.
+    # relative_prefix is the normalised path from rootdir, ending with a separator below the root.
+    level = [(rootdir, "", None, None, dir_structure)]
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        while level:
+            # Hand each worker a contiguous batch of directories to keep per-task overhead low
+            locations = [item[:2] for item in level]
+            batch_size = (len(locations) + SCAN_WORKERS - 1) // SCAN_WORKERS
+            batches = [locations[i:i + batch_size] for i in range(0, len(locations), batch_size)]
+            if len(batches) == 1:
+                listings = list_directories(locations)
+            else:
+                listings = itertools.chain.from_iterable(executor.map(list_directories, batches))
+            next_level = []
+            for (dir_path, relative_prefix, parent, name, subdir), listing in zip(level, listings):
+                if listing is None or (listing[2] and parent is not None):
+                    # Unreadable directories are left out, as os.walk does, and so are
+                    # virtual environments below the root
+                    if parent is not None:
+                        del parent[name]
+                    continue
+
+                # Files come first, followed by the subdirectories in listing order
+                filenames, subdirs, _ = listing
+                for filename in filenames:
+                    subdir[filename] = None
+                for entry in subdirs:
+                    child = subdir[entry.name] = {}
+                    next_level.append((entry.path, relative_prefix + os.path.normcase(entry.name) + os.sep, subdir, entry.name, child))
+            level = next_level
     return dir_structure
 
+def _list_directories(locations, compiled, default_ignores=True):
+    """
+    Lists each (dir_path, relative_prefix) in locations with _list_directory.
+    """
+    return [_list_directory(dir_path, relative_prefix, compiled, default_ignores) for dir_path, relative_prefix in locations]
+
+def _list_directory(dir_path, relative_prefix, compiled, default_ignores=True):
+    """
+    Lists one directory and returns the names of its files, the DirEntry objects
+    of its subdirectories and whether it is a virtual environment to leave out,
+    or None if it cannot be listed.
+    """
+    filenames = []
+    subdirs = []
+    is_venv = False
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                # Virtual environments are recognised by their marker file rather than by name,
+                # so packages that happen to be called e.g. venv are still documented
+                if default_ignores and entry.name == VENV_MARKER:
+                    is_venv = True
+                # Filter out hidden entries
+                if entry.name.startswith('.'):
+                    continue
+                # The file type comes from the directory listing, so no extra stat is needed.
+                # An entry that cannot be classified (e.g. a symlink loop) counts as a file, as in os.walk.
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                # Dependency and cache directories are pruned with a set lookup before any pattern matching
+                if default_ignores and is_dir and entry.name in DEFAULT_IGNORED_DIRS:
+                    continue
+                # Filter out ignored entries
+                name = os.path.normcase(entry.name)
+                if matches_compiled(name, relative_prefix + name, is_dir, compiled):
+                    continue
+                if is_dir:
+                    # Symlinked directories are not followed
+                    try:
+                        is_symlink = entry.is_symlink()
+                    except OSError:
+                        is_symlink = False
+                    if not is_symlink:
+                        subdirs.append(entry)
+                else:
+                    filenames.append(entry.name)
+    except OSError:
+        return None
+    return filenames, subdirs, is_venv
+
 def build_tree_string(structure, indent=0, numbering=None):
     """
-    Recursively builds a string representing the folder structure as a numbered list.
+    Builds a string representing the folder structure as a numbered list.
     """
     if numbering is None:
         numbering = []
-    
-    tree_string = ""
-    for index, (key, value) in enumerate(structure.items(), start=1):
-        current_numbering = numbering + [index]
-        number_str = ".".join(map(str, current_numbering))
-        
-        tree_string += f"{'    ' * indent}{number_str} {key}/\n" if value is not None else f"{'    ' * indent}{number_str} {key}\n"
-        
-        if value is not None:
-            tree_string += build_tree_string(value, indent + 1, current_numbering)
-    
-    return tree_string
-
-def create_markdown_from_structure(structure, rootdir, markdown_file, numbering=None, additional_ignores=None):
-    """
-    Recursively writes the folder structure and file contents to the markdown file.
+
+    lines = []
+    # Explicit stack of (items, padding, number prefix) per open directory instead of
+    # recursion. Padding and prefix are built once per directory and extended per entry.
+    stack = [(enumerate(structure.items(), start=1), '    ' * indent, _number_prefix(numbering))]
+    while stack:
+        items, padding, prefix = stack[-1]
+        for index, (key, value) in items:
+            number_str = f"{prefix}{index}"
+
+            if value is None:
+                lines.append(f"{padding}{number_str} {key}\n")
+            else:
+                lines.append(f"{padding}{number_str} {key}/\n")
+                # Descend now; this directory's remaining items resume once the child is done
+                stack.append((enumerate(value.items(), start=1), padding + '    ', number_str + '.'))
+                break
+        else:
+            stack.pop()
+    return "".join(lines)
+
+def _number_prefix(numbering):
+    """
+    Returns the section number prefix for the children of numbering, e.g. '2.1.' for [2, 1].
+    """
+    return "".join(f"{number}." for number in numbering)
+
+def create_markdown_from_structure(structure, rootdir, markdown_file, numbering=None, additional_ignores=None, deduplicate=True, max_file_size=None):
+    """
+    Writes the folder structure and file contents to the markdown file.
+    Files are read in parallel by a thread pool and written in document order.
+    With deduplicate, a file identical to an earlier one refers to its section instead.
+    Binary files, and files larger than max_file_size bytes if given, get a note instead of their content.
     """
     if numbering is None:
         numbering = []
     if additional_ignores is None:
         additional_ignores = []
 
-    for index, (key, value) in enumerate(structure.items(), start=1):
-        current_numbering = numbering + [index]
-        number_str = ".".join(map(str, current_numbering))
-
-        # Check if this path should be ignored from documentation
-        relative_path = os.path.relpath(os.path.join(rootdir, key), rootdir)
-        if matches_pattern(relative_path, additional_ignores):
-            continue
-
-        if value is None:
-            # It's a file, write its content
-            file_path = os.path.join(rootdir, key)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-            except UnicodeDecodeError:
-                try:
-                    with open(file_path, 'r', encoding='latin-1') as file:
-                        content = file.read()
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-                    continue
+    entries = list(iter_documented_entries(structure, rootdir, numbering, additional_ignores))
+    # Known binary formats have no text to document, so they are never opened
+    file_paths = [file_path for _, key, file_path, is_dir in entries if not is_dir and not has_binary_extension(key)]
+    read_file = functools.partial(read_file_content_and_digest, max_file_size=max_file_size, with_digest=deduplicate)
+    seen_digests = {}
 
-            markdown_file.write(f"## {number_str} {key}\n\n")
-            markdown_file.write(f"```{get_file_extension(key)}\n")
+    # Reads release the GIL, so threads are enough to overlap the I/O
+    max_workers = max(1, min(32, len(file_paths)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        contents = map_in_order(executor, read_file, file_paths, max_pending=2 * max_workers)
+        for number_str, key, _, is_dir in entries:
+            if is_dir:
+                markdown_file.write(f"# {number_str} {key}/\n\n")
+                continue
+
+            if has_binary_extension(key):
+                content, digest = BINARY_FILE, None
+            else:
+                content, digest = next(contents)
+            if content is None:
+                # Unreadable file, the error has already been printed
+                continue
+            if isinstance(content, SkippedFile):
+                markdown_file.write(f"## {number_str} {key}\n\n*Skipped: {content.reason}*\n\n")
+                continue
+
+            if digest is not None:
+                if digest in seen_digests:
+                    markdown_file.write(f"## {number_str} {key}\n\n*Duplicate of section {seen_digests[digest]}*\n\n")
+                    continue
+                seen_digests[digest] = number_str
+            # One write for the heading and opening fence, one for the body, one for the closing fence
+            fence = get_code_fence(content)
+            markdown_file.write(f"## {number_str} {key}\n\n{fence}{get_file_extension(key)}\n")
             markdown_file.write(content)
-            markdown_file.write("\n```\n\n")
+            markdown_file.write(f"\n{fence}\n\n")
+
+def get_code_fence(content):
+    """
+    Returns a backtick fence longer than any backtick run in content, so that fences
+    inside the file (e.g. in Markdown sources) cannot close the code block early.
+    """
+    fence = "```"
+    while fence in content:
+        fence += "`"
+    return fence
+
+def iter_documented_entries(structure, rootdir, numbering, additional_ignores):
+    """
+    Yields (number_str, key, path, is_dir) for every entry to document, in document order.
+    """
+    # Explicit stack of (items, path prefix, number prefix) per open directory instead of
+    # recursion. The path prefix ends with a separator, so an entry's path is a plain concatenation.
+    stack = [(enumerate(structure.items(), start=1), os.path.join(rootdir, ''), _number_prefix(numbering))]
+    while stack:
+        items, path_prefix, prefix = stack[-1]
+        for index, (key, value) in items:
+            number_str = f"{prefix}{index}"
+
+            # Check if this path should be ignored from documentation.
+            # Keys are plain entry names, so the path relative to rootdir is the key itself.
+            if matches_pattern(key, additional_ignores, is_dir=value is not None):
+                continue
+
+            path = path_prefix + key
+            if value is None:
+                yield number_str, key, path, False
+            else:
+                yield number_str, key, path, True
+                # Descend now; this directory's remaining items resume once the child is done
+                stack.append((enumerate(value.items(), start=1), path + os.sep, number_str + '.'))
+                break
         else:
-            # It's a directory, write its name and recurse
-            markdown_file.write(f"# {number_str} {key}/\n\n")
-            create_markdown_from_structure(value, os.path.join(rootdir, key), markdown_file, current_numbering, additional_ignores)
+            stack.pop()
+
+def map_in_order(executor, func, items, max_pending):
+    """
+    Like executor.map, but keeps at most max_pending results in flight so that
+    only a bounded number of file contents is held in memory at once.
+    """
+    pending = deque()
+    for item in items:
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+        pending.append(executor.submit(func, item))
+    while pending:
+        yield pending.popleft().result()
+
+def read_file_content_and_digest(file_path, max_file_size=None, with_digest=True):
+    """
+    Reads a file once as bytes, decodes it as text and returns (content, digest).
+    content is None if the file cannot be read, and a SkippedFile if it looks binary
+    or is larger than max_file_size. With with_digest, digest is a BLAKE2b hash of the
+    raw bytes that were read, so files only count as identical if their bytes are;
+    otherwise, and for empty, unreadable, binary or oversized files, it is None.
+    """
+    try:
+        fd = _open_for_reading(file_path)
+        try:
+            content, digest = _decode_fd(fd, max_file_size, with_digest)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"Error reading {file_path}: {e}")
+        return None, None
+
+    if content is None or isinstance(content, SkippedFile):
+        # Unreadable, binary or oversized file, there is no text to document
+        return content, None
+
+    # Match the newline translation of a text-mode read
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content, digest
+
+def _open_for_reading(file_path):
+    """
+    Opens file_path read-only as a raw descriptor. Where supported, O_NOATIME keeps
+    the read from writing back an updated access time.
+    """
+    flags = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+    noatime = getattr(os, 'O_NOATIME', 0)
+    if noatime:
+        try:
+            return os.open(file_path, flags | noatime)
+        except PermissionError:
+            # O_NOATIME is only allowed for the file's owner
+            pass
+    return os.open(file_path, flags)
+
+def _decode_fd(fd, max_file_size=None, with_digest=False):
+    """
+    Decodes the file behind fd, memory-mapping it when it is large, and returns (content, digest).
+    content is a SkippedFile if the file looks binary or is larger than max_file_size.
+    """
+    size = os.fstat(fd).st_size
+    if max_file_size is not None and size > max_file_size:
+        return SkippedFile(f"{size} bytes, over --max-file-size"), None
+    if size >= MMAP_THRESHOLD:
+        # Decode straight from the page cache instead of copying into a bytes object first
+        try:
+            mapped = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            pass
+        else:
+            with mapped:
+                return _decode_and_digest(mapped, with_digest)
+    return _decode_and_digest(_read_fd(fd, size), with_digest)
+
+def _decode_and_digest(data, with_digest):
+    """
+    Decodes data with decode_text and returns (content, digest), hashing the buffer
+    in place when with_digest is set and there is text content.
+    """
+    content = decode_text(data)
+    if content is None:
+        return BINARY_FILE, None
+    if not content or not with_digest:
+        return content, None
+    return content, hashlib.blake2b(data, digest_size=16).digest()
+
+def decode_text(data):
+    """
+    Decodes a bytes-like object as text, or returns None if it looks binary.
+    UTF-16/32 files are recognised by their byte order mark; anything else is decoded
+    as UTF-8, falling back to latin-1.
+    """
+    head = data[:8]
+    for bom, encoding in TEXT_BOMS:
+        if head.startswith(bom):
+            return str(data, encoding, 'replace')
+    if head.startswith(BINARY_SIGNATURES):
+        return None
+    # NUL bytes never occur in text; sampling the tail as well catches binaries
+    # that start with a long text header
+    # find() with bounds scans the buffer in place without slicing out copies
+    if data.find(b'\x00', 0, SNIFF_HEAD_SIZE) != -1 or data.find(b'\x00', max(0, len(data) - SNIFF_TAIL_SIZE)) != -1:
+        return None
+
+    try:
+        return str(data, 'utf-8')
+    except UnicodeDecodeError:
+        return str(data, 'latin-1')
+
+def _read_fd(fd, size):
+    """
+    Reads a whole file from a raw descriptor with os.read. The size comes from fstat,
+    so most files take a single read call without the buffered IO layer.
+    """
+    if size == 0:
+        # Size is unknown (e.g. special files), read until EOF
+        chunks = []
+        while True:
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+
+    data = os.read(fd, size)
+    if len(data) < size:
+        # Short read, keep going until the expected size or EOF
+        chunks = [data]
+        remaining = size - len(data)
+        while remaining > 0:
+            chunk = os.read(fd, remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        data = b"".join(chunks)
+    return data
+
+def has_binary_extension(filename):
+    """
+    Checks whether filename has the extension of a known binary format.
+    """
+    return get_file_extension(filename).lower() in BINARY_EXTENSIONS
 
 def get_file_extension(filename):
     """
     Returns the file extension without the leading dot.
     """
-    return filename.split('.')[-1] if '.' in filename else ''
+    _, dot, extension = filename.rpartition('.')
+    return extension if dot else ''